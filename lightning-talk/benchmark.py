@@ -0,0 +1,362 @@
+'''
+benchmark.py
+
+A benchmark and profiling harness for the algorithms in this directory.
+
+Each demo runs on one small, fixed dataset, which makes it hard to tell how any of them
+will hold up on real data. This script generates synthetic inputs of increasing size
+(with fixed random seeds, so runs are repeatable) for each stage of each project, runs
+them, and records for every run:
+
+    wall         Elapsed time, in seconds
+    cpu          User + system CPU time, in seconds, including any worker processes
+    peak_memory  Peak memory allocated by the stage itself, in kilobytes
+    profile      Optionally, the functions with the most cumulative time under cProfile
+
+Every run happens in a fresh child process, so memory from one run doesn't leak into
+the next and each project's modules are imported only by the runs that need them, and
+a run that crashes or gets killed for running out of memory is recorded as an error
+instead of taking the whole benchmark down with it. Generating the input data is not
+timed.
+
+peak_memory comes from tracemalloc, which counts Python objects and NumPy arrays
+allocated after setup, so imports and input data don't hide what the stage itself uses.
+It doesn't see memory used by worker processes. Tracing slows everything down, so it
+runs as a second pass in its own child process rather than during the timed one.
+
+Results are written as JSON. Pass an earlier results file as --baseline to compare
+against it; any run that got slower or bigger by more than --threshold is flagged, and
+the script exits with status 1.
+
+Usage:
+    python benchmark.py                                  # Everything, default sizes
+    python benchmark.py --cases imwa-run --sizes 100000 1000000 --profile 10
+    python benchmark.py --output new.json --baseline old.json
+'''
+import os, sys, json, time, random, string, shutil, tempfile, argparse, traceback
+import multiprocessing, tracemalloc, cProfile, pstats
+from queue import Empty
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+########## CASES ##########
+
+CASES = {}
+
+def case(name, directory, sizes):
+    '''
+    Register a benchmark. The decorated function takes a size, a random.Random and a
+    scratch directory, builds its input, and returns a function that runs the stage
+    being measured.
+    '''
+    def register(setup):
+        CASES[name] = {'directory': directory, 'sizes': sizes, 'setup': setup}
+        return setup
+    return register
+
+def _words(rng, n, vocabulary=2000):
+    vocab = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+             for _ in range(vocabulary)]
+    return [rng.choice(vocab) for _ in range(n)]
+
+def _write_documents(rng, n, directory, length=300):
+    os.makedirs(directory)
+    for i in range(n):
+        with open(os.path.join(directory, 'doc%06d.txt' % i), 'w') as outfile:
+            outfile.write(' '.join(_words(rng, length)))
+
+@case('vp-trees', 'vp-trees', [250, 500, 1000, 2000])
+def vp_trees(n, rng, workdir):
+    from vptree import VPTree
+    from similarity import jaccard
+    base = 'PACIFIC GAS & ELECTRIC CO'
+    def variant():
+        chars = list(base)
+        for _ in range(rng.randint(1, 6)):
+            chars[rng.randrange(len(chars))] = rng.choice(string.ascii_uppercase + ' &.')
+        return ''.join(chars)
+    names = list(set(variant() for _ in range(n)))
+    queries = [variant() for _ in range(20)]
+    def run():
+        tree = VPTree(names, jaccard)
+        for q in queries:
+            tree.search(q, 0.5)
+    return run
+
+@case('naive-bayes', 'naive-bayes', [1000, 10000, 100000])
+def naive_bayes(n, rng, workdir):
+    from naivebayes import NaiveBayes
+    features = 10
+    data = [[rng.choice('AB')] + [rng.choice('wxyz') for _ in range(features)] for _ in range(n)]
+    tests = [[rng.choice('wxyz') for _ in range(features)] for _ in range(1000)]
+    def run():
+        classifier = NaiveBayes(data)
+        classifier.train()
+        for t in tests:
+            classifier.classify(t)
+    return run
+
+@case('lda-corpus', 'lda', [100, 1000, 5000])
+def lda_corpus(n, rng, workdir):
+    from corpus import StreamingCorpus
+    _write_documents(rng, n, os.path.join(workdir, 'docs'))
+    def run():
+        StreamingCorpus(os.path.join(workdir, 'docs', '*.txt'), os.path.join(workdir, 'corpus'),
+                        cache_dir=os.path.join(workdir, 'tokens')).load()
+    return run
+
+def _lda_corpus(rng, n, workdir):
+    from corpus import StreamingCorpus
+    _write_documents(rng, n, os.path.join(workdir, 'docs'))
+    return StreamingCorpus(os.path.join(workdir, 'docs', '*.txt'), os.path.join(workdir, 'corpus')).load()
+
+@case('lda-train', 'lda', [100, 1000, 5000])
+def lda_train(n, rng, workdir):
+    import gensim
+    corpus = _lda_corpus(rng, n, workdir)
+    def run():
+        gensim.models.LdaModel(corpus=corpus, id2word=corpus.dictionary, num_topics=10,
+                               passes=1, random_state=0)
+    return run
+
+@case('lda-inference', 'lda', [100, 1000, 5000])
+def lda_inference(n, rng, workdir):
+    import gensim
+    from inference import TopicIndex
+    corpus = _lda_corpus(rng, n, workdir)
+    lda = gensim.models.LdaModel(corpus=corpus, id2word=corpus.dictionary, num_topics=10,
+                                 passes=1, random_state=0)
+    def run():
+        TopicIndex.build(lda, corpus)
+    return run
+
+def _ord_file(rng, members, votes, path):
+    with open(path, 'w') as outfile:
+        for i in range(members):
+            name = ''.join(rng.choice(string.ascii_uppercase) for _ in range(8))
+            header = '113%05d41 1ALABAMA 200%s%-11s' % (i, rng.choice(['00', '01']), name)
+            outfile.write(header + ''.join(rng.choice('1116669') for _ in range(votes)) + '\n')
+
+@case('vectorization-parse', 'vectorization', [100, 500, 2000])
+def vectorization_parse(n, rng, workdir):
+    import ordfile
+    path = os.path.join(workdir, 'votes.ord')
+    _ord_file(rng, n, 1000, path)
+    # Make sure the fixture lines up with ordfile.HEADER, or we'd be timing garbage.
+    codes = ordfile.load(path, cache=False).codes
+    assert codes.shape == (n, 1000) and codes.max() <= 9, 'malformed .ord fixture'
+    def run():
+        ordfile.load(path, cache=False)
+    return run
+
+@case('vectorization-similarity', 'vectorization', [100, 500, 2000])
+def vectorization_similarity(n, rng, workdir):
+    import numpy
+    from votes import VoteMatrix
+    codes = numpy.random.RandomState(rng.randint(0, 2 ** 31)).choice([1, 6, 9], size=(n, 1000))
+    def run():
+        VoteMatrix(codes).agreement()
+    return run
+
+def _contributions(rng, n, path, donors=None, candidates=500):
+    donors = donors or max(10, n // 3)
+    with open(path, 'w') as outfile:
+        for _ in range(n):
+            row = [''] * 21
+            row[0] = 'C%05d' % rng.randrange(candidates)
+            row[7] = 'DONOR %d' % rng.randrange(donors)
+            row[10] = '%05d' % rng.randrange(100)
+            row[14] = str(rng.randint(1, 2700))
+            outfile.write('|'.join(row) + '\n')
+
+@case('imwa-load', 'iterative-algorithms', [10000, 100000, 1000000])
+def imwa_load(n, rng, workdir):
+    from loader import load_contributions
+    path = os.path.join(workdir, 'itcont.txt')
+    _contributions(rng, n, path)
+    def run():
+        load_contributions(path).matrix
+    return run
+
+@case('imwa-run', 'iterative-algorithms', [10000, 100000, 1000000])
+def imwa_run(n, rng, workdir):
+    import numpy
+    from loader import load_contributions
+    from engine import IMWA
+    path = os.path.join(workdir, 'itcont.txt')
+    _contributions(rng, n, path)
+    matrix = load_contributions(path).matrix
+    start = numpy.array([rng.choice([-1.0, 1.0]) for _ in range(matrix.shape[1])])
+    def run():
+        IMWA(matrix, start).run(tol=1e-6, max_iter=100)
+    return run
+
+########## MEASUREMENT ##########
+
+def _cpu():
+    t = os.times()
+    return t[0] + t[1] + t[2] + t[3]
+
+def _top_functions(profile, limit):
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({'function': '%s:%s(%s)' % (os.path.relpath(filename, HERE) if filename.startswith(HERE) else filename, line, function),
+                     'calls': nc, 'tottime': round(tt, 6), 'cumtime': round(ct, 6)})
+    rows.sort(key=lambda r: r['cumtime'], reverse=True)
+    return rows[:limit]
+
+def _measure(name, size, seed, profile, memory, queue):
+    '''
+    Child process: build the input for one case and size, then time it -- or, if
+    ``memory`` is set, trace its peak allocation instead.
+    '''
+    spec = CASES[name]
+    result = {'case': name, 'size': size, 'seed': seed}
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        directory = os.path.join(HERE, spec['directory'])
+        sys.path.insert(0, directory)
+        os.chdir(directory)
+
+        rng = random.Random(seed)
+        try:
+            import numpy
+            numpy.random.seed(seed)
+        except ImportError:
+            pass
+
+        run = spec['setup'](size, rng, workdir)
+
+        if memory:
+            tracemalloc.start()
+            try:
+                run()
+                result['peak_memory'] = tracemalloc.get_traced_memory()[1] // 1024
+            finally:
+                tracemalloc.stop()
+        else:
+            profiler = cProfile.Profile() if profile else None
+            wall, cpu = time.time(), _cpu()
+            if profiler:
+                profiler.runcall(run)
+            else:
+                run()
+            result['wall'] = time.time() - wall
+            result['cpu'] = _cpu() - cpu
+            if profiler:
+                result['profile'] = _top_functions(profiler, profile)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    queue.put(result)
+
+def _child(name, size, seed, profile, memory):
+    '''
+    Run _measure() in a child process and wait for its result. If the child dies
+    without sending one -- killed for running out of memory, say, or crashed -- that's
+    recorded as an error for this run rather than waiting forever.
+    '''
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(name, size, seed, profile, memory, queue))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                # It may have sent a result just before exiting; give that one last chance.
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    result = {'case': name, 'size': size, 'seed': seed,
+                              'error': 'child exited with code %s' % process.exitcode}
+    process.join()
+    return result
+
+def measure(name, size, seed=0, profile=0):
+    '''
+    Run one case at one size in a fresh child process and return its results, then
+    run it again in another to measure its memory.
+    '''
+    result = _child(name, size, seed, profile, False)
+    if 'error' not in result:
+        traced = _child(name, size, seed, 0, True)
+        if 'error' in traced:
+            result['error'] = traced['error']
+        else:
+            result['peak_memory'] = traced['peak_memory']
+    return result
+
+########## COMPARISON ##########
+
+METRICS = ('wall', 'cpu', 'peak_memory')
+
+def compare(results, baseline, threshold=0.25):
+    '''
+    Ratio of each metric to the matching baseline run (same case and size). Returns a
+    list of comparisons and a list of the ones that grew by more than ``threshold``.
+    '''
+    previous = dict(((r['case'], r['size']), r) for r in baseline['results'] if 'error' not in r)
+    comparisons, regressions = [], []
+    for r in results['results']:
+        old = previous.get((r['case'], r['size']))
+        if old is None or 'error' in r:
+            continue
+        comparison = {'case': r['case'], 'size': r['size']}
+        for metric in METRICS:
+            if old.get(metric):
+                comparison[metric] = r[metric] / old[metric]
+        comparisons.append(comparison)
+        if any(comparison.get(m, 0) > 1 + threshold for m in METRICS):
+            regressions.append(comparison)
+    return comparisons, regressions
+
+########## MAIN ##########
+
+def run(cases, sizes=None, seed=0, profile=0):
+    results = []
+    for name in cases:
+        for size in sizes or CASES[name]['sizes']:
+            result = measure(name, size, seed, profile)
+            if 'error' in result:
+                sys.stderr.write('%s @ %s failed:\n%s\n' % (name, size, result['error']))
+            else:
+                sys.stderr.write('%s @ %s: wall %.3fs, cpu %.3fs, peak %s KB\n' % (
+                    name, size, result['wall'], result['cpu'], result['peak_memory']))
+            results.append(result)
+    return {'python': sys.version.split()[0], 'seed': seed, 'timestamp': time.time(), 'results': results}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the lightning talk algorithms.')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument('--sizes', nargs='+', type=int, help='Override the default input sizes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='Profile each run and keep the top N functions by cumulative time')
+    parser.add_argument('--output', help='Write results here instead of to stdout')
+    parser.add_argument('--baseline', help='Compare against an earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Flag runs that grew by more than this fraction over the baseline')
+    args = parser.parse_args()
+
+    results = run(args.cases, args.sizes, args.seed, args.profile)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as infile:
+            comparisons, regressions = compare(results, json.load(infile), args.threshold)
+        results['comparison'] = comparisons
+        for c in comparisons:
+            sys.stderr.write('%-26s %10s  %s%s\n' % (c['case'], c['size'], '  '.join(
+                '%s x%.2f' % (m, c[m]) for m in METRICS if m in c), '  <-- REGRESSION' if c in regressions else ''))
+        status = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    sys.exit(status)
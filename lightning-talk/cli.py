@@ -0,0 +1,143 @@
+'''
+cli.py
+
+One command line entry point for the demos in this directory.
+
+Each demo can still be run on its own, but they all import big libraries -- gensim and
+NLTK each take about a second to load -- and when a script launches thousands of short
+jobs, that startup cost adds up to more than the work itself. This CLI only imports what
+the chosen subcommand needs, when it needs it: classifying a headline never loads gensim,
+and refreshing the LDA token cache loads neither gensim nor NumPy.
+
+Pass --timings to see how long each heavy import took compared to the actual work. For a
+full breakdown of every module imported, run Python with -X importtime.
+
+Usage:
+    python cli.py lda [--pattern 'data/*.txt'] [--topics 2] [--passes 10]
+    python cli.py lda-preprocess [--pattern 'data/*.txt'] [--processes N]
+    python cli.py naive-bayes 'Some press release headline'
+    python cli.py vectorization CANTOR [--k 10] [--pair DELBENE] [--ord data/hou112kh.ord]
+    python cli.py --timings naive-bayes 'Some press release headline'
+'''
+import os, sys, time, argparse, importlib
+
+START = time.time()
+HERE = os.path.dirname(os.path.abspath(__file__))
+TIMINGS = []
+
+########## HELPERS ##########
+
+def timed(label, function, *args, **kwargs):
+    '''
+    Call a function and record how long it took under ``label``.
+    '''
+    start = time.time()
+    result = function(*args, **kwargs)
+    TIMINGS.append((label, time.time() - start))
+    return result
+
+def require(*modules):
+    '''
+    Import third-party modules, timing each one.
+    '''
+    return [timed('import %s' % m, importlib.import_module, m) for m in modules]
+
+def project(directory):
+    '''
+    Import the demo module for one of the project directories. The demos all share the
+    name demo.py, which is fine since each invocation only ever runs one subcommand.
+    '''
+    sys.path.insert(0, os.path.join(HERE, directory))
+    return timed('import %s/demo' % directory, importlib.import_module, 'demo')
+
+########## SUBCOMMANDS ##########
+
+def lda(args):
+    require('numpy', 'gensim')
+    demo = project('lda')
+    corpus = timed('load corpus', demo.load_corpus, args.pattern, args.cache)
+    model = timed('train', demo.find_topics, corpus, args.topics, args.passes)
+    index = timed('index', demo.index_documents, model, corpus)
+    for topic in model.show_topics(num_topics=args.topics):
+        print(topic)
+    for name, score in index.outliers(n=args.outliers):
+        print('Outlier: %s (%.3f)' % (os.path.basename(name), score))
+
+def lda_preprocess(args):
+    sys.path.insert(0, os.path.join(HERE, 'lda'))
+    preprocess = timed('import lda/preprocess', importlib.import_module, 'preprocess')
+    import glob
+    filenames = sorted(glob.glob(args.pattern))
+    stale = timed('tokenize', preprocess.update_cache, filenames,
+                  os.path.join(args.cache, 'tokens'), args.processes)
+    print('Tokenized %s of %s documents' % (len(stale), len(filenames)))
+
+def naive_bayes(args):
+    require('nltk')
+    demo = project('naive-bayes')
+    timed('load stopwords', demo.english_stopwords)
+    classifier = timed('train', demo.train, demo.read_training(args.training))
+    print(timed('classify', demo.classify, classifier, args.headline))
+
+def vectorization(args):
+    require('numpy')
+    demo = project('vectorization')
+    looker_upper = timed('load votes', demo.build_looker_upper, args.ord, materialize=False)
+    for name in (args.name, args.pair):
+        if name and name not in looker_upper.index:
+            sys.exit('unknown member: %s' % name)
+    if args.pair:
+        print(timed('lookup', looker_upper.lookup_pair, args.name, args.pair))
+    else:
+        for name, score in timed('lookup', looker_upper.top_k, args.name, args.k):
+            print('%s: %.4f' % (name, score))
+
+########## MAIN ##########
+
+def parser():
+    parser = argparse.ArgumentParser(description='Run the lightning talk demos.')
+    parser.add_argument('--timings', action='store_true', help='Report import and run times on stderr')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('lda', help='Find topics in a set of documents')
+    command.add_argument('--pattern', default=os.path.join(HERE, 'lda', 'data', '*.txt'))
+    command.add_argument('--cache', default=os.path.join(HERE, 'lda', 'cache'))
+    command.add_argument('--topics', type=int, default=2)
+    command.add_argument('--passes', type=int, default=10)
+    command.add_argument('--outliers', type=int, default=1)
+    command.set_defaults(run=lda)
+
+    command = commands.add_parser('lda-preprocess', help='Refresh the LDA token cache')
+    command.add_argument('--pattern', default=os.path.join(HERE, 'lda', 'data', '*.txt'))
+    command.add_argument('--cache', default=os.path.join(HERE, 'lda', 'cache'))
+    command.add_argument('--processes', type=int, default=None)
+    command.set_defaults(run=lda_preprocess)
+
+    command = commands.add_parser('naive-bayes', help='Classify a DEA press release headline')
+    command.add_argument('headline')
+    command.add_argument('--training', default=os.path.join(HERE, 'naive-bayes', 'data', 'training.txt'))
+    command.set_defaults(run=naive_bayes)
+
+    command = commands.add_parser('vectorization', help='Find the members who vote most like another')
+    command.add_argument('name')
+    command.add_argument('--k', type=int, default=10)
+    command.add_argument('--pair', help='Just compare with this one member')
+    command.add_argument('--ord', default=os.path.join(HERE, 'vectorization', 'data', 'hou112kh.ord'))
+    command.set_defaults(run=vectorization)
+    return parser
+
+def report():
+    total = time.time() - START
+    importing = sum(t for label, t in TIMINGS if label.startswith('import '))
+    for label, seconds in TIMINGS:
+        sys.stderr.write('%-28s %7.3fs\n' % (label, seconds))
+    sys.stderr.write('%-28s %7.3fs (%.0f%% importing)\n' % ('total', total, 100 * importing / total if total else 0))
+
+if __name__ == '__main__':
+    args = parser().parse_args()
+    try:
+        args.run(args)
+    finally:
+        if args.timings:
+            report()
@@ -0,0 +1,204 @@
+'''
+engine.py
+
+A sparse-matrix version of Iterated Money-Weighted Averaging, suitable for a full FEC
+cycle rather than a handful of donors.
+
+imwa.py spells the algorithm out with loops over lists of dictionaries, which is nice
+for seeing how it works but scales terribly: every iteration walks every donor's
+donations for every candidate. But each half of an IMWA iteration is really just a
+weighted average, and a weighted average over a whole population at once is a matrix
+multiplication. If A is a (donors x candidates) matrix of total amounts given, then:
+
+    donor scores      = (A  . candidate scores) / amount each donor gave
+    candidate scores  = (A' . donor scores)     / amount each candidate received
+
+Almost every donor gives to only a few candidates, so A is overwhelmingly zeros and we
+store it as a SciPy sparse matrix, which only keeps the nonzero entries:
+http://docs.scipy.org/doc/scipy/reference/sparse.html
+
+With that, each iteration costs time proportional to the number of (donor, candidate)
+pairs, and rather than stopping after a fixed number of iterations we can stop once the
+scores stop changing.
+
+New contributions don't have to mean starting over, either. Scores from a previous run
+make a better starting point than 0 and +/-1, and update() folds new amounts into the
+matrix and first re-scores only the donors and candidates they touch before iterating
+the whole thing back to convergence. Scores spread slowly through the donor graph, so
+this usually saves some iterations rather than most of them.
+'''
+import numpy
+import scipy.sparse
+
+########## HELPERS ##########
+
+def _divide(numerator, denominator):
+    '''
+    Elementwise division that leaves a 0 wherever the denominator is 0 (a donor who
+    gave nothing, or a candidate who received nothing).
+    '''
+    result = numpy.zeros_like(numerator)
+    nonzero = denominator != 0
+    result[nonzero] = numerator[nonzero] / denominator[nonzero]
+    return result
+
+########## ENGINE ##########
+
+class IMWA(object):
+    '''
+    Iterated Money-Weighted Averaging over a sparse (donors x candidates) matrix of
+    contribution amounts.
+
+    ``candidates`` holds the starting candidate scores (for example -1 for Democrats
+    and 1 for Republicans). Donor scores start at ``donors`` if given, otherwise 0.
+    After run(), the converged scores are in ``self.candidates`` and ``self.donors``,
+    and ``self.residuals`` holds the largest change in any score at each iteration.
+
+    To warm-start from an earlier run, pass its candidate and donor scores, or use
+    save() and load().
+    '''
+    def __init__(self, amounts, candidates, donors=None):
+        self._set_amounts(scipy.sparse.csr_matrix(amounts, dtype=numpy.float64))
+
+        self.candidates = numpy.array(candidates, dtype=numpy.float64)
+        if donors is None:
+            self.donors = numpy.zeros(self.amounts.shape[0])
+        else:
+            self.donors = numpy.array(donors, dtype=numpy.float64)
+        self.residuals = []
+        self.local_residuals = []
+        self.converged = False
+        self.mean, self.stdev = 0.0, 1.0
+
+    def save(self, path):
+        '''
+        Save the current scores, and the normalization behind them, to an .npz file.
+        '''
+        with open(path, 'wb') as outfile:
+            numpy.savez(outfile, candidates=self.candidates, donors=self.donors,
+                        scale=numpy.array([self.mean, self.stdev]))
+
+    @classmethod
+    def load(cls, amounts, path):
+        '''
+        Start a new IMWA over ``amounts`` from the scores saved by an earlier run.
+        '''
+        with numpy.load(path) as data:
+            imwa = cls(amounts, data['candidates'], data['donors'])
+            imwa.mean, imwa.stdev = data['scale']
+        return imwa
+
+    def _set_amounts(self, amounts):
+        self.amounts = amounts
+        self.amounts_t = amounts.T.tocsr()
+        self.donor_totals = numpy.asarray(amounts.sum(axis=1)).ravel()
+        self.candidate_totals = numpy.asarray(amounts.sum(axis=0)).ravel()
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+    def normalize(self, scores):
+        '''
+        Rescale candidate scores to mean 0 and standard deviation 1, counting only
+        candidates who actually received money.
+        '''
+        funded = self.candidate_totals != 0
+        if not funded.any():
+            return scores
+        self.mean = scores[funded].mean()
+        self.stdev = scores[funded].std() or 1.0
+        scores = (scores - self.mean) / self.stdev
+        scores[~funded] = 0.0
+        return scores
+
+    def step(self):
+        '''
+        One full iteration: donors from candidates, then candidates from donors, then
+        normalize. Returns the largest change in any score.
+        '''
+        donors = _divide(self.amounts.dot(self.candidates), self.donor_totals)
+        candidates = _divide(self.amounts_t.dot(donors), self.candidate_totals)
+        candidates = self.normalize(candidates)
+
+        residual = max(numpy.abs(donors - self.donors).max() if len(donors) else 0.0,
+                       numpy.abs(candidates - self.candidates).max() if len(candidates) else 0.0)
+        self.donors, self.candidates = donors, candidates
+        self.residuals.append(residual)
+        return residual
+
+    def run(self, tol=1e-6, max_iter=1000):
+        '''
+        Iterate until no score changes by more than ``tol`` between iterations, or until
+        ``max_iter`` iterations have run. Afterwards, ``self.converged`` says which.
+        Returns self.
+        '''
+        self.residuals = []
+        self.converged = False
+        for _ in range(max_iter):
+            if self.step() <= tol:
+                self.converged = True
+                break
+        return self
+
+    ########## INCREMENTAL UPDATES ##########
+
+    def add(self, delta, candidates=None):
+        '''
+        Add a (donors x candidates) matrix of new contribution amounts. It may be bigger
+        than the current matrix, if new donors or candidates have turned up: new donors
+        start with a score of 0 and new candidates with the scores in ``candidates``
+        (0 if not given). Returns the ids of the donors and candidates it touched.
+        '''
+        delta = scipy.sparse.csr_matrix(delta, dtype=numpy.float64)
+        shape = (max(self.amounts.shape[0], delta.shape[0]), max(self.amounts.shape[1], delta.shape[1]))
+        amounts, delta = self.amounts.copy(), delta.copy()
+        amounts.resize(shape)
+        delta.resize(shape)
+        self._set_amounts((amounts + delta).tocsr())
+
+        new_candidates = shape[1] - len(self.candidates)
+        if candidates is None:
+            candidates = numpy.zeros(new_candidates)
+        self.candidates = numpy.concatenate([self.candidates, numpy.asarray(candidates, dtype=numpy.float64)])
+        self.donors = numpy.concatenate([self.donors, numpy.zeros(shape[0] - len(self.donors))])
+
+        touched = delta.tocoo()
+        return numpy.unique(touched.row), numpy.unique(touched.col)
+
+    def local_step(self, donor_ids, candidate_ids):
+        '''
+        Like step(), but only re-score the given donors and candidates, holding every
+        other score and the normalization from the last full iteration fixed. Returns
+        the largest change in any of their scores.
+        '''
+        donors = _divide(self.amounts[donor_ids].dot(self.candidates), self.donor_totals[donor_ids])
+        donor_residual = numpy.abs(donors - self.donors[donor_ids]).max() if len(donors) else 0.0
+        # As in step(), candidates are scored from the donor scores we just computed.
+        self.donors[donor_ids] = donors
+
+        raw = _divide(self.amounts_t[candidate_ids].dot(self.donors), self.candidate_totals[candidate_ids])
+        candidates = (raw - self.mean) / self.stdev
+        residual = max(donor_residual,
+                       numpy.abs(candidates - self.candidates[candidate_ids]).max() if len(candidates) else 0.0)
+        self.candidates[candidate_ids] = candidates
+        self.local_residuals.append(residual)
+        return residual
+
+    def update(self, delta, candidates=None, tol=1e-6, max_iter=1000, max_local_iter=100):
+        '''
+        Fold in new contributions and re-converge, starting from the current scores.
+        First iterate on just the donors and candidates in ``delta`` (recorded in
+        ``self.local_residuals``), then on the whole graph (``self.residuals``) until
+        everything settles. Returns self.
+
+        The local phase only settles the neighborhood of the new contributions; the full
+        iterations still have to carry those changes through the rest of the graph, so
+        expect a modest saving over a cold run, not a dramatic one.
+        '''
+        donor_ids, candidate_ids = self.add(delta, candidates)
+        self.local_residuals = []
+        for _ in range(max_local_iter):
+            if self.local_step(donor_ids, candidate_ids) <= tol:
+                break
+        return self.run(tol, max_iter)
@@ -4,7 +4,7 @@ like this to optimization for machine learning. An iterative approach to a probl
 allows an algorithm to generate progressively better solutions until either the
 solutions become optimal (or close to it) -- a state known as convergence -- or the
 iteration is stopped for another reason, such as to save time and computing resources.
-You can read more about the concept here: vhttp://en.wikipedia.org/wiki/Iterative_method 
+You can read more about the concept here: http://en.wikipedia.org/wiki/Iterative_method 
 
 This particular algorithm was developed by Adam Bonica, political science professor at
 Stanford University. Known as Iterated Money-Weighted Averaging, it uses campaign
@@ -20,8 +20,8 @@ require examining voting records, meaning they can only be used for sitting memb
 candidates. However, because it relies only on campaign contribution data, IMWA is able to 
 infer the ideologies of candidates that have never served in office.
 '''
-import math
-from pprint import pprint
+import scipy.sparse
+from engine import IMWA
 
 if __name__ == '__main__':
 
@@ -43,49 +43,42 @@ if __name__ == '__main__':
         {'name': 'McCain', 'cfscore': 1}
     ]
 
-    # In this case, we're just going cut off the algorithm after 10 iterations, rather than waiting for
-    # perfect convergence. The variable i is just a counter.
-    i = 0
-    while i < 10:
+    # Rather than looping over donors and their donations, we lay the money out in a matrix with one row
+    # per donor and one column per candidate, holding the total each donor gave each candidate. Most donors
+    # only give to a few candidates, so we store it as a sparse matrix, which only keeps the nonzero cells.
+    cand_ids = dict((c['name'], i) for i, c in enumerate(cands))
+    rows, cols, amounts = [], [], []
+    for i, d in enumerate(donors):
+        for recipient, amount in d['donations']:
+            rows.append(i)
+            cols.append(cand_ids[recipient])
+            amounts.append(amount)
+    matrix = scipy.sparse.coo_matrix((amounts, (rows, cols)), shape=(len(donors), len(cands)))
 
-        # Set CF score for donors. Scores are just derived from money-weighted averages of the amount
-        # given to a candidate times the ideological score of that candidate, which changes with each
-        # iteration
-        for d in donors:
-            score, total = 0.0, 0.0
-            for c in d['donations']:
-                recipient, amount = c
-                candidate = next((item for item in cands if item["name"] == recipient), None)
-
-                score += amount * candidate['cfscore']
-                total += amount
-            d['cfscore'] = score / total
-
-        # Now set the CF score for candidates. These are derived from the average weighted ideological
-        # score of each candidate's contributor, summed and averaged.
-        for c in cands:
-            score, total = 0.0, 0.0
-            for d in donors:
-                donations = [e[1] for e in d['donations'] if e[0] == c['name']]
-                for amount in donations:
-                    score += amount * d['cfscore']
-                    total += amount
-            c['cfscore'] = score / total
-
-        # Now we normalize candidate scores to mean = 0, standard deviation = 1
-        scores = [c['cfscore'] for c in cands]
-        mean = sum(scores) / len(scores)
-        variance = map(lambda x: (x - mean) ** 2, scores)
-        stdev = sum(variance) / len(variance)
-        for c in cands:
-            c['cfscore'] = (c['cfscore'] - mean) / stdev
-
-        # Repeat until convergence (in this case, arbirarily set at 10 iterations)
-        i += 1
+    # Each iteration does two things, each of which is now a single matrix-vector product:
+    #
+    # 1. Sets the CF score for donors. Scores are just derived from money-weighted averages of the amount
+    #    given to a candidate times the ideological score of that candidate, which changes with each iteration.
+    # 2. Sets the CF score for candidates. These are derived from the average weighted ideological score of
+    #    each candidate's contributors, summed and averaged.
+    #
+    # Then candidate scores are normalized to mean = 0, standard deviation = 1. Instead of cutting the algorithm
+    # off after some arbitrary number of iterations, we keep going until the scores stop changing. See engine.py.
+    imwa = IMWA(matrix, [c['cfscore'] for c in cands]).run(tol=1e-9)
+    for c, score in zip(cands, imwa.candidates):
+        c['cfscore'] = score
+    for d, score in zip(donors, imwa.donors):
+        d['cfscore'] = score
 
     # Print out the results. Negative numbers lean Democratic, positive lean Republican
-    print 'Candidates'
-    map(lambda c: pprint('%s: %s' % (c['name'], c['cfscore'])), cands)
+    if imwa.converged:
+        print('Converged after %s iterations' % imwa.iterations)
+    else:
+        print('Stopped after %s iterations without converging' % imwa.iterations)
+    print('Candidates')
+    for c in cands:
+        print('%s: %s' % (c['name'], c['cfscore']))
 
-    print 'Donors'
-    map(lambda d: pprint('%s: %s' % (d['name'], d['cfscore'])), donors)
\ No newline at end of file
+    print('Donors')
+    for d in donors:
+        print('%s: %s' % (d['name'], d['cfscore']))
@@ -0,0 +1,193 @@
+'''
+loader.py
+
+Build the donor x candidate matrix IMWA needs straight from raw contribution records.
+
+The FEC publishes individual contributions as pipe-delimited text files, one row per
+contribution: http://www.fec.gov/finance/disclosure/ftpdet.shtml. A full cycle runs
+to tens of millions of rows, far more than we want to hold in memory as Python
+objects. But IMWA only cares about how much each donor gave each candidate in total,
+and that's a much smaller thing: one number per unique (donor, candidate) pair.
+
+So we read the file a chunk of rows at a time, swap each donor and candidate for an
+integer id (assigned the first time we see them), and add the chunk's amounts into a
+sparse matrix, summing duplicates as we go. The finished matrix and the id maps can be
+saved to disk and loaded back without touching the raw files again.
+'''
+import io, csv, json
+import numpy
+import scipy.sparse
+
+# Field positions in the FEC's individual contributions file (itcont.txt). The
+# recipient is the committee the money went to; the donor is identified by name and ZIP.
+FEC_DONOR_FIELDS = (7, 10)
+FEC_RECIPIENT_FIELD = 0
+FEC_AMOUNT_FIELD = 14
+
+# FEC bulk files aren't reliably UTF-8, and one bad byte shouldn't end a load hours in.
+# Latin-1 maps every byte to some character, so decoding never fails.
+FEC_ENCODING = 'latin-1'
+
+########## READING ##########
+
+def read_chunks(path, chunksize=100000, delimiter='|', skip_header=False, encoding=FEC_ENCODING):
+    '''
+    Yield lists of up to ``chunksize`` parsed rows from a delimited file, decoded with
+    ``encoding``.
+    '''
+    with io.open(path, 'r', encoding=encoding, newline='') as infile:
+        reader = csv.reader(infile, delimiter=delimiter, quoting=csv.QUOTE_NONE)
+        if skip_header:
+            next(reader, None)
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+########## MATRIX ##########
+
+class ContributionMatrix(object):
+    '''
+    A sparse (donors x candidates) matrix of total amounts given, along with the
+    identifiers behind each row and column. Donor and candidate ids are assigned in
+    the order they're first seen, so ``donors[i]`` is the donor in row i.
+
+    New contributions are buffered and only folded into the matrix once the buffer
+    is as big as the matrix itself, which keeps the cost of summing duplicates
+    proportional to the size of the data rather than the number of chunks.
+    '''
+    def __init__(self):
+        self.donor_ids = {}
+        self.candidate_ids = {}
+        self.donors = []
+        self.candidates = []
+        self.skipped = 0
+        self._matrix = scipy.sparse.csr_matrix((0, 0))
+        self._buffer = []
+        self._buffered = 0
+
+    def _intern(self, key, ids, keys):
+        i = ids.get(key)
+        if i is None:
+            i = ids[key] = len(keys)
+            keys.append(key)
+        return i
+
+    def add(self, donors, candidates, amounts):
+        '''
+        Add parallel sequences of donor keys, candidate keys and amounts.
+        '''
+        rows = numpy.array([self._intern(d, self.donor_ids, self.donors) for d in donors], dtype=numpy.int64)
+        cols = numpy.array([self._intern(c, self.candidate_ids, self.candidates) for c in candidates], dtype=numpy.int64)
+        self._buffer.append((rows, cols, numpy.asarray(amounts, dtype=numpy.float64)))
+        self._buffered += len(rows)
+        if self._buffered >= max(self._matrix.nnz, 100000):
+            self._consolidate()
+
+    def add_records(self, records, donor_fields=FEC_DONOR_FIELDS, candidate_field=FEC_RECIPIENT_FIELD,
+                    amount_field=FEC_AMOUNT_FIELD):
+        '''
+        Add a chunk of parsed rows. The donor key is the tuple of ``donor_fields``;
+        rows that are too short or have a non-numeric amount are counted in
+        ``self.skipped`` and left out.
+        '''
+        width = max(max(donor_fields), candidate_field, amount_field) + 1
+        donors, candidates, amounts = [], [], []
+        for row in records:
+            try:
+                amount = float(row[amount_field]) if len(row) >= width else None
+            except ValueError:
+                amount = None
+            if amount is None:
+                self.skipped += 1
+                continue
+            donors.append(tuple(row[f].strip() for f in donor_fields))
+            candidates.append(row[candidate_field].strip())
+            amounts.append(amount)
+        self.add(donors, candidates, amounts)
+
+    def _consolidate(self):
+        shape = (len(self.donors), len(self.candidates))
+        matrix = self._matrix.tocoo()
+        rows = numpy.concatenate([matrix.row] + [b[0] for b in self._buffer])
+        cols = numpy.concatenate([matrix.col] + [b[1] for b in self._buffer])
+        data = numpy.concatenate([matrix.data] + [b[2] for b in self._buffer])
+        # Converting from COO to CSR sums up entries for the same (donor, candidate) pair.
+        self._matrix = scipy.sparse.coo_matrix((data, (rows, cols)), shape=shape).tocsr()
+        self._buffer = []
+        self._buffered = 0
+
+    def stream(self, paths, chunksize=100000, delimiter='|', skip_header=False,
+               donor_fields=FEC_DONOR_FIELDS, candidate_field=FEC_RECIPIENT_FIELD,
+               amount_field=FEC_AMOUNT_FIELD, encoding=FEC_ENCODING):
+        '''
+        Read one or more contribution files into this matrix, ``chunksize`` rows at a
+        time. See load_contributions() for the arguments.
+        '''
+        if isinstance(paths, str):
+            paths = [paths]
+        for path in paths:
+            for chunk in read_chunks(path, chunksize, delimiter, skip_header, encoding):
+                self.add_records(chunk, donor_fields, candidate_field, amount_field)
+        return self
+
+    def load_delta(self, paths, **kwargs):
+        '''
+        Read new contribution files into this matrix, and return a matrix of just the
+        new amounts, using the same donor and candidate ids (so existing donors keep
+        their rows and new ones are added at the end). That's what IMWA.update() takes.
+        '''
+        delta = ContributionMatrix()
+        delta.donor_ids, delta.donors = self.donor_ids, self.donors
+        delta.candidate_ids, delta.candidates = self.candidate_ids, self.candidates
+        matrix = delta.stream(paths, **kwargs).matrix
+
+        new = matrix.tocoo()
+        self._buffer.append((new.row, new.col, new.data))
+        self._buffered += new.nnz
+        self.skipped += delta.skipped
+        return matrix
+
+    @property
+    def matrix(self):
+        if self._buffer or self._matrix.shape != (len(self.donors), len(self.candidates)):
+            self._consolidate()
+        return self._matrix
+
+    def save(self, prefix):
+        '''
+        Write the matrix to ``<prefix>.npz`` and the id maps to ``<prefix>.json``.
+        '''
+        scipy.sparse.save_npz('%s.npz' % prefix, self.matrix)
+        with open('%s.json' % prefix, 'w') as outfile:
+            json.dump({'donors': self.donors, 'candidates': self.candidates}, outfile)
+
+    @classmethod
+    def load(cls, prefix):
+        contributions = cls()
+        with open('%s.json' % prefix, 'r') as infile:
+            ids = json.load(infile)
+        # JSON turns donor key tuples into lists; turn them back.
+        contributions.donors = [tuple(d) if isinstance(d, list) else d for d in ids['donors']]
+        contributions.candidates = ids['candidates']
+        contributions.donor_ids = dict((d, i) for i, d in enumerate(contributions.donors))
+        contributions.candidate_ids = dict((c, i) for i, c in enumerate(contributions.candidates))
+        contributions._matrix = scipy.sparse.load_npz('%s.npz' % prefix).tocsr()
+        return contributions
+
+def load_contributions(paths, chunksize=100000, delimiter='|', skip_header=False,
+                       donor_fields=FEC_DONOR_FIELDS, candidate_field=FEC_RECIPIENT_FIELD,
+                       amount_field=FEC_AMOUNT_FIELD, encoding=FEC_ENCODING):
+    '''
+    Stream one or more contribution files into a ContributionMatrix, ``chunksize``
+    rows at a time. The defaults match the FEC's pipe-delimited itcont.txt; for a CSV
+    with a header row, pass ``delimiter=','`` and ``skip_header=True`` along with the
+    positions of the relevant fields, and ``encoding`` if the file is known to be
+    something other than Latin-1.
+    '''
+    return ContributionMatrix().stream(paths, chunksize, delimiter, skip_header,
+                                       donor_fields, candidate_field, amount_field, encoding)
@@ -0,0 +1,146 @@
+'''
+corpus.py
+
+A streaming corpus for the LDA demo. The original version of demo.py read every
+document into a list, cleaned it (twice), built a list of tokenized texts and then
+a full list of bag-of-words vectors before training even started. That's fine for
+seven sections of the Credit Card Act, but it means the whole corpus has to fit in
+memory, which won't be true for an entire legislative session.
+
+Instead, StreamingCorpus reads and tokenizes files one at a time from a glob, builds
+the gensim dictionary in the same pass and writes the bag-of-words vectors straight
+to disk in Matrix Market format, which gensim knows how to stream:
+http://radimrehurek.com/gensim/tut1.html#corpus-streaming-one-document-at-a-time
+
+Once that's done, every LDA pass just iterates over the serialized file, so the raw
+text is never read or cleaned again until the source documents change.
+'''
+import os, glob
+import gensim
+from preprocess import tokenize, tokenized, stoplist_hash, STOPLIST
+
+########## CORPUS ##########
+
+class StreamingCorpus(object):
+    '''
+    A re-iterable corpus of bag-of-words vectors backed by files on disk.
+
+    The corpus is built from every file matching ``pattern`` and stored under
+    ``prefix``: the vectors go in ``<prefix>.mm``, the gensim dictionary in
+    ``<prefix>.dict``, the list of source files, in document order, in
+    ``<prefix>.files`` and a hash of the stoplist in ``<prefix>.stoplist``. Iterating
+    over the corpus builds those files the first time (or whenever the source
+    documents or the stoplist have changed) and streams from them after that.
+
+    If ``cache_dir`` is given, documents are tokenized in parallel across ``processes``
+    workers and their tokens cached there (see preprocess.py), so a rebuild after a
+    few files change only has to clean and tokenize those files.
+    '''
+    def __init__(self, pattern, prefix, stoplist=STOPLIST, cache_dir=None, processes=None):
+        self.pattern = pattern
+        self.prefix = prefix
+        self.stoplist = stoplist
+        self.cache_dir = cache_dir
+        self.processes = processes
+        self.dictionary = None
+        self.filenames = None
+        self._corpus = None
+
+    @property
+    def mm_path(self):
+        return '%s.mm' % self.prefix
+
+    @property
+    def dict_path(self):
+        return '%s.dict' % self.prefix
+
+    @property
+    def files_path(self):
+        return '%s.files' % self.prefix
+
+    @property
+    def stoplist_path(self):
+        return '%s.stoplist' % self.prefix
+
+    def sources(self):
+        '''
+        The files matching this corpus' glob, in a stable order.
+        '''
+        return sorted(glob.glob(self.pattern))
+
+    def texts(self):
+        '''
+        Lazily yield (filename, tokens) pairs, reading one source file at a time.
+        '''
+        if self.cache_dir:
+            for pair in tokenized(self.sources(), self.cache_dir, self.processes, self.stoplist):
+                yield pair
+            return
+        for filename in self.sources():
+            with open(filename, 'r') as infile:
+                yield filename, tokenize(infile.read(), self.stoplist)
+
+    def is_stale(self):
+        '''
+        True if the serialized corpus is missing, was built with a different stoplist,
+        or if source files have been added, removed or modified since it was written.
+        '''
+        for path in (self.mm_path, self.dict_path, self.files_path, self.stoplist_path):
+            if not os.path.exists(path):
+                return True
+        with open(self.stoplist_path, 'r') as infile:
+            if infile.read().strip() != stoplist_hash(self.stoplist):
+                return True
+        with open(self.files_path, 'r') as infile:
+            if infile.read().splitlines() != self.sources():
+                return True
+        built = os.path.getmtime(self.mm_path)
+        return any(os.path.getmtime(f) > built for f in self.sources())
+
+    def build(self):
+        '''
+        Tokenize every source document once, growing the dictionary as we go, and
+        serialize the resulting bag-of-words vectors to disk. Only one document is
+        held in memory at a time.
+        '''
+        directory = os.path.dirname(self.prefix)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        dictionary = gensim.corpora.Dictionary()
+        filenames = []
+
+        def bows():
+            for filename, tokens in self.texts():
+                filenames.append(filename)
+                yield dictionary.doc2bow(tokens, allow_update=True)
+
+        gensim.corpora.MmCorpus.serialize(self.mm_path, bows())
+        dictionary.save(self.dict_path)
+        with open(self.files_path, 'w') as outfile:
+            outfile.write(''.join('%s\n' % f for f in filenames))
+        with open(self.stoplist_path, 'w') as outfile:
+            outfile.write('%s\n' % stoplist_hash(self.stoplist))
+
+        self._corpus = None
+        return self
+
+    def load(self):
+        '''
+        Open the serialized corpus and dictionary, building them first if needed.
+        '''
+        if self._corpus is None and self.is_stale():
+            self.build()
+        if self._corpus is None:
+            self._corpus = gensim.corpora.MmCorpus(self.mm_path)
+            self.dictionary = gensim.corpora.Dictionary.load(self.dict_path)
+            with open(self.files_path, 'r') as infile:
+                self.filenames = infile.read().splitlines()
+        return self
+
+    def __iter__(self):
+        for bow in self.load()._corpus:
+            yield bow
+
+    def __len__(self):
+        return len(self.load()._corpus)
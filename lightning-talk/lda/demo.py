@@ -15,44 +15,71 @@ In this example, we'll use LDA to look at a very small subset of sections from t
 Credit Card Act of 2009, which we'll see contains at least one segment that doesn't 
 relate at all to credit cards.
 '''
-import string, re, glob
-import gensim
+import os
 
-########## HELPERS ##########
+HERE = os.path.dirname(os.path.abspath(__file__))
 
-PUNCTUATION = re.compile('([%s]|[0-9]|\n)' % re.escape(string.punctuation))
+# gensim takes about a second to import, so the functions below import it (directly or via
+# corpus.py and inference.py) only when they're called.
 
-def clean_text(txt):
+########## LIBRARY ##########
+
+def load_corpus(pattern=os.path.join(HERE, 'data', '*.txt'), cache=os.path.join(HERE, 'cache')):
     '''
-    Helper function to do some basic cleaning on the text. Removing punctuation,
-    stripping whitespace and lowercasing.
+    Tokenize and serialize the documents matching ``pattern``, or load them from ``cache``
+    if nothing has changed since last time. See corpus.py and preprocess.py.
     '''
-    return PUNCTUATION.sub('', txt.lower().strip())
+    from corpus import StreamingCorpus
+    return StreamingCorpus(pattern, os.path.join(cache, 'sections'),
+                           cache_dir=os.path.join(cache, 'tokens')).load()
 
-########## MAIN ##########
+def find_topics(corpus, num_topics=2, passes=10, random_state=1):
+    '''
+    Train an LDA model on the corpus. LDA starts from random topic assignments, so the
+    seed is fixed to make the demo's output the same from run to run.
+    '''
+    import gensim
+    return gensim.models.ldamodel.LdaModel(corpus=corpus, id2word=corpus.dictionary,
+                                           num_topics=num_topics, passes=passes,
+                                           random_state=random_state)
 
-if __name__ == '__main__':
-    # Open up some raw documents and read their text into a list. In this case, the raw docs
-    # correspond to a few select (and dirty) sections of the Credit Card Act of 2009, which you
-    # can see here: https://www.govtrack.us/congress/bills/111/hr627/text
-    documents = [clean_text(open(f, 'r').read()) for f in glob.iglob('data/*.txt')]
+def index_documents(lda, corpus):
+    from inference import TopicIndex
+    return TopicIndex.build(lda, corpus)
 
-    # A little basic cleanup with an abbreviated stopword list
-    stoplist = set('for is with a on shall such an any not by or that of the and to in'.split())
-    texts = [[word for word in clean_text(document).split() if word not in stoplist] for document in documents]
+########## MAIN ##########
 
-    # Use gensim to prep the data into a dictionary and corpus
-    dictionary = gensim.corpora.Dictionary(texts)
-    corpus = [dictionary.doc2bow(text) for text in texts]
+if __name__ == '__main__':
+    # Stream some raw documents off disk. In this case, the raw docs correspond to a few select
+    # (and dirty) sections of the Credit Card Act of 2009, which you can see here:
+    # https://www.govtrack.us/congress/bills/111/hr627/text
+    #
+    # The first time through, each document is read, cleaned and tokenized (with an abbreviated
+    # stopword list) exactly once, and the resulting dictionary and bag-of-words corpus are saved
+    # under cache/. Every pass LDA makes after that streams the corpus back from disk, so we never
+    # need to hold the whole thing in memory. Tokenizing is spread across all available cores, and
+    # each document's tokens are cached so that re-runs only touch files that have changed. See
+    # corpus.py and preprocess.py for the details.
+    corpus = load_corpus()
 
     # Simple LDA pass, looking for 2 topics over 10 iterations. These are parameters you'll likely want to
-    # tweak if you use this on your own data. The number of topics in particular.
-    lda = gensim.models.ldamodel.LdaModel(corpus=corpus, id2word=dictionary, num_topics=2, passes=10)
+    # tweak if you use this on your own data. The number of topics in particular. On a bigger corpus,
+    # train.py shows how to spread training across every core and stop once the model converges.
+    lda = find_topics(corpus, num_topics=2, passes=10)
 
     # Looping through the words that characterize the two topics we created, we'll see one that seems to
     # contain a lot of credit card-related words, which makes sense for a bill like this, and another that
-    # contains words related to national parks and the Second Amendment, which seem a bit out of place. If
-    # we wanted to, we could walk back through the documents, assign them topics based on the weights given
-    # to each topic's words, and classify them on a topical basis in order to see the section that doesn't belong.
+    # contains words related to national parks and the Second Amendment, which seem a bit out of place.
     for topic in lda.show_topics():
-        print topic
\ No newline at end of file
+        print(topic)
+
+    # Now walk back through the documents and see which ones go with which topic. TopicIndex runs the
+    # model over the whole corpus in batches, producing a documents x topics matrix, then ranks documents
+    # by their weight on each topic and by how well the corpus-wide mix of topics explains them. The
+    # section that doesn't belong should show up as the worst fit. See inference.py for the details.
+    index = index_documents(lda, corpus)
+    for topic in range(lda.num_topics):
+        print('Topic %s: %s' % (topic, ', '.join('%s (%.3f)' % (os.path.basename(name), weight)
+                                                  for name, weight in index.documents(topic, n=3))))
+    for name, score in index.outliers(n=1):
+        print('Most out of place: %s (%.3f)' % (os.path.basename(name), score))
@@ -0,0 +1,134 @@
+'''
+inference.py
+
+Once LDA has found its topics, the next step is usually to walk back through the
+documents and figure out which topics each one is about -- and which documents don't
+fit well with any of them, like the national parks section hiding in the Credit Card
+Act.
+
+Asking a gensim model about one document at a time (lda[bow]) works, but it runs the
+inference loop and a bunch of Python bookkeeping per document. Here we hand whole
+chunks of the corpus to the model's inference step at once, which gives back the
+document-topic weights for the entire chunk as a NumPy array. Stacking those gives a
+documents x topics matrix for the whole corpus, which is all we need to rank documents
+by topic or score how well each document fits the model, using array operations
+instead of loops.
+'''
+import numpy
+import gensim
+
+########## INFERENCE ##########
+
+def _chunks(corpus, chunksize):
+    chunk = []
+    for bow in corpus:
+        chunk.append(bow)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def document_topics(lda, corpus, chunksize=2000):
+    '''
+    Infer topic weights for every document in the corpus, ``chunksize`` documents at a
+    time. Returns a (documents x topics) array whose rows sum to 1.
+    '''
+    rows = []
+    for chunk in _chunks(corpus, chunksize):
+        gamma, _ = lda.inference(chunk)
+        rows.append(gamma / gamma.sum(axis=1)[:, numpy.newaxis])
+    if not rows:
+        return numpy.zeros((0, lda.num_topics))
+    return numpy.vstack(rows)
+
+def document_likelihoods(lda, corpus, mixture, chunksize=2000):
+    '''
+    Average log-likelihood per word of each document under a single topic
+    ``mixture`` -- typically the corpus-wide mean of the document-topic weights.
+    Each word's probability is its weight in each topic, times how much of that
+    topic the mixture contains, summed over topics.
+
+    Scoring every document under the same mixture, rather than its own inferred
+    weights, is what makes the odd one out stand out: a section that ends up with a
+    topic all to itself is explained perfectly well by its own weights, but its
+    words are rare in the corpus as a whole, so it scores low here.
+    '''
+    # Probability of each term under the mixture: (topics) . (topics x terms).
+    words = numpy.asarray(mixture, dtype=numpy.float64).dot(lda.get_topics())
+    scores = []
+    for chunk in _chunks(corpus, chunksize):
+        # Sparse (terms x documents) counts for the chunk, flattened to coordinates.
+        counts = gensim.matutils.corpus2csc(chunk, num_terms=len(words)).tocoo()
+        loglik = numpy.bincount(counts.col, counts.data * numpy.log(words[counts.row]), minlength=len(chunk))
+        length = numpy.bincount(counts.col, counts.data, minlength=len(chunk))
+        scores.append(loglik / numpy.maximum(length, 1))
+    return numpy.concatenate(scores) if scores else numpy.zeros(0)
+
+########## INDEX ##########
+
+class TopicIndex(object):
+    '''
+    Document-topic weights for a corpus, along with each topic's documents ranked by
+    weight and each document's average log-likelihood per word under the corpus-wide
+    topic mixture. Built once, then queried without going back to the model.
+    '''
+    def __init__(self, theta, likelihoods, filenames=None):
+        self.theta = theta
+        self.likelihoods = likelihoods
+        self.filenames = filenames
+        # Column t holds document ids sorted by their weight on topic t, highest first.
+        self.ranked = numpy.argsort(-theta, axis=0, kind='mergesort')
+
+    @classmethod
+    def build(cls, lda, corpus, chunksize=2000):
+        '''
+        Run batched inference over a corpus. If the corpus knows which file each
+        document came from (like a StreamingCorpus), those names are kept too.
+        '''
+        theta = document_topics(lda, corpus, chunksize)
+        mixture = theta.mean(axis=0) if len(theta) else numpy.zeros(lda.num_topics)
+        likelihoods = document_likelihoods(lda, corpus, mixture, chunksize)
+        return cls(theta, likelihoods, getattr(corpus, 'filenames', None))
+
+    def save(self, prefix):
+        '''
+        Save the matrix and scores to ``<prefix>.npz``.
+        '''
+        names = numpy.array(self.filenames if self.filenames is not None else [])
+        numpy.savez(prefix, theta=self.theta, likelihoods=self.likelihoods, filenames=names)
+
+    @classmethod
+    def load(cls, prefix):
+        with numpy.load('%s.npz' % prefix) as data:
+            filenames = [str(f) for f in data['filenames']] or None
+            return cls(data['theta'], data['likelihoods'], filenames)
+
+    def _label(self, ids):
+        if self.filenames is None:
+            return ids
+        return [self.filenames[i] for i in ids]
+
+    def dominant_topics(self):
+        '''
+        The single highest-weighted topic for each document.
+        '''
+        return self.theta.argmax(axis=1)
+
+    def documents(self, topic, n=10):
+        '''
+        The ``n`` documents with the most weight on ``topic``, as (document, weight)
+        pairs, highest first.
+        '''
+        ids = self.ranked[:n, topic]
+        return list(zip(self._label(ids), self.theta[ids, topic]))
+
+    def outliers(self, n=10):
+        '''
+        The ``n`` documents the model explains worst, as (document, score) pairs, lowest
+        average log-likelihood per word first.
+        '''
+        n = min(n, len(self.likelihoods))
+        ids = numpy.argpartition(self.likelihoods, n - 1)[:n] if n else numpy.arange(0)
+        ids = ids[numpy.argsort(self.likelihoods[ids])]
+        return list(zip(self._label(ids), self.likelihoods[ids]))
@@ -0,0 +1,162 @@
+'''
+preprocess.py
+
+Parallel, incremental cleaning and tokenizing for the LDA demo.
+
+Cleaning text with a regex and filtering stopwords is cheap for one document, but it
+adds up over an entire legislative session, and there's no reason to redo it every
+time we run the model when only a handful of files have changed. This module does
+two things about that:
+
+1. Fans documents out to a pool of worker processes, so tokenizing uses every core
+   on the machine instead of one.
+2. Caches each document's tokens on disk, keyed by its path, size, modification
+   time and the stoplist used. On later runs, only new or changed files are sent
+   to the pool; everything else is read straight back from the cache.
+
+Python's multiprocessing module is documented here:
+http://docs.python.org/2/library/multiprocessing.html
+'''
+import os, string, re, hashlib, multiprocessing
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+PUNCTUATION = re.compile('([%s]|[0-9]|\n)' % re.escape(string.punctuation))
+
+# An abbreviated stopword list. Feel free to swap in something more complete.
+STOPLIST = frozenset('for is with a on shall such an any not by or that of the and to in'.split())
+
+########## HELPERS ##########
+
+def clean_text(txt):
+    '''
+    Helper function to do some basic cleaning on the text. Removing punctuation,
+    stripping whitespace and lowercasing.
+    '''
+    return PUNCTUATION.sub('', txt.lower().strip())
+
+def tokenize(txt, stoplist=STOPLIST):
+    '''
+    Clean a raw document and split it into a list of words, leaving out stopwords.
+    '''
+    return [word for word in clean_text(txt).split() if word not in stoplist]
+
+def stoplist_hash(stoplist):
+    '''
+    A short, stable fingerprint of a stoplist, so anything built with one stoplist
+    can tell it isn't valid for another.
+    '''
+    return hashlib.sha1(' '.join(sorted(stoplist)).encode('utf-8')).hexdigest()
+
+########## CACHE ##########
+
+class TokenCache(object):
+    '''
+    On-disk cache of tokenized documents, one pickle per source file and stoplist.
+    Each entry is named after the path, size and modification time of the file it
+    was built from and a hash of the stoplist, so an entry is only found if the file
+    hasn't changed since and the same words are being left out -- and checking that
+    is just a matter of seeing whether the entry exists, without unpickling it.
+
+    Entries for old versions of a file are left behind; it's always safe to delete
+    the whole directory.
+    '''
+    def __init__(self, directory, stoplist=STOPLIST):
+        self.directory = directory
+        self.stoplist = stoplist_hash(stoplist)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def signature(self, filename):
+        stat = os.stat(filename)
+        return (os.path.abspath(filename), stat.st_size, stat.st_mtime, self.stoplist)
+
+    def path(self, signature):
+        key = hashlib.sha1('\0'.join(str(part) for part in signature).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, '%s.pickle' % key)
+
+    def get(self, filename):
+        '''
+        Return the cached tokens for a file, or None if there's no valid entry.
+        '''
+        try:
+            with open(self.path(self.signature(filename)), 'rb') as infile:
+                signature, tokens = pickle.load(infile)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        return tokens
+
+    def is_fresh(self, filename):
+        return os.path.exists(self.path(self.signature(filename)))
+
+    def put(self, filename, signature, tokens):
+        '''
+        Store tokens for a file. Entries are written to a temporary file and moved
+        into place so a crashed worker can't leave a half-written entry behind.
+        '''
+        path = self.path(signature)
+        tmp = '%s.%s.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as outfile:
+            pickle.dump((signature, tokens), outfile, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, path)
+
+########## WORKERS ##########
+
+def _tokenize_file(args):
+    '''
+    Worker function: tokenize one file and write it to the cache. Tokens are handed
+    back through the cache rather than through the pool, so the parent process never
+    has to hold more than one document at a time.
+    '''
+    filename, directory, stoplist = args
+    cache = TokenCache(directory, stoplist)
+    # Take the signature before reading, so a file modified mid-read looks stale next time.
+    signature = cache.signature(filename)
+    with open(filename, 'r') as infile:
+        tokens = tokenize(infile.read(), stoplist)
+    cache.put(filename, signature, tokens)
+    return filename
+
+def update_cache(filenames, directory, processes=None, stoplist=STOPLIST):
+    '''
+    Tokenize any of the given files that are new or have changed since they were last
+    cached, spreading the work across ``processes`` worker processes (by default, one
+    per CPU). Returns the list of files that had to be (re)processed.
+    '''
+    cache = TokenCache(directory, stoplist)
+    stale = [f for f in filenames if not cache.is_fresh(f)]
+    jobs = [(f, directory, stoplist) for f in stale]
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(jobs) <= 1:
+        for job in jobs:
+            _tokenize_file(job)
+        return stale
+
+    pool = multiprocessing.Pool(min(processes, len(jobs)))
+    try:
+        chunksize = max(1, len(jobs) // (processes * 4))
+        for _ in pool.imap_unordered(_tokenize_file, jobs, chunksize):
+            pass
+    finally:
+        pool.close()
+        pool.join()
+    return stale
+
+def tokenized(filenames, directory, processes=None, stoplist=STOPLIST):
+    '''
+    Bring the cache up to date for the given files, then lazily yield (filename, tokens)
+    pairs from it in the order the files were given.
+    '''
+    update_cache(filenames, directory, processes, stoplist)
+    cache = TokenCache(directory, stoplist)
+    for filename in filenames:
+        tokens = cache.get(filename)
+        if tokens is None:
+            # The file changed again after we cached it; just tokenize it here.
+            with open(filename, 'r') as infile:
+                tokens = tokenize(infile.read(), stoplist)
+        yield filename, tokens
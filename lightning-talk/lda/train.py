@@ -0,0 +1,102 @@
+'''
+train.py
+
+Multicore LDA training for the demo in this directory.
+
+A single gensim LdaModel trains on one core. gensim also ships LdaMulticore, which
+splits each mini-batch of documents across a pool of worker processes for the
+expensive E-step (inferring topic mixtures for each document), then merges the
+sufficient statistics the workers send back into a single M-step update of the
+topics. It needs nothing beyond the multiprocessing module, so it runs on any
+multi-core box: http://radimrehurek.com/gensim/models/ldamulticore.html
+
+Rather than always running a fixed number of passes, train_multicore() makes one
+online pass over the corpus at a time and checks perplexity after each, stopping as
+soon as it stops improving by more than a given tolerance. Running this file
+directly trains on data/*.txt both ways and reports the wall-clock speedup.
+'''
+import time, itertools, multiprocessing
+import gensim
+
+########## TRAINING ##########
+
+def perplexity(lda, corpus):
+    '''
+    Perplexity of a corpus under a trained model. Lower is better. gensim reports a
+    per-word likelihood bound in log base 2, so perplexity is 2 to the minus that.
+    '''
+    return 2 ** -lda.log_perplexity(corpus)
+
+def train_multicore(corpus, dictionary, num_topics, workers=None, chunksize=2000,
+                    max_passes=50, tol=1e-3, eval_docs=None, **kwargs):
+    '''
+    Train an LDA model with the E-step spread across ``workers`` processes (by default,
+    one fewer than the number of CPUs, leaving one for the master), in online
+    mini-batches of ``chunksize`` documents.
+
+    Training stops after ``max_passes`` passes over the corpus, or earlier once the
+    relative change in perplexity between two passes falls below ``tol``. Perplexity
+    is measured on the first ``eval_docs`` documents (all of them by default), which
+    is worth capping on a large corpus since it costs an extra read.
+
+    Returns the model, the list of per-pass perplexities, and whether perplexity
+    settled within ``tol`` (as opposed to training running out of passes).
+    '''
+    workers = workers or max(1, multiprocessing.cpu_count() - 1)
+    lda = gensim.models.LdaMulticore(id2word=dictionary, num_topics=num_topics, workers=workers,
+                                     chunksize=chunksize, passes=1, **kwargs)
+
+    if eval_docs:
+        eval_corpus = list(itertools.islice(corpus, eval_docs))
+    else:
+        eval_corpus = corpus
+
+    history = []
+    converged = False
+    for _ in range(max_passes):
+        lda.update(corpus)
+        history.append(perplexity(lda, eval_corpus))
+        if len(history) > 1 and abs(history[-2] - history[-1]) <= tol * history[-2]:
+            converged = True
+            break
+    return lda, history, converged
+
+def compare(corpus, dictionary, num_topics, passes=10, workers=None, chunksize=2000):
+    '''
+    Train the same model serially with LdaModel and in parallel with LdaMulticore,
+    for the same fixed number of passes, and return the wall-clock time of each along
+    with the speedup.
+    '''
+    start = time.time()
+    gensim.models.LdaModel(corpus=corpus, id2word=dictionary, num_topics=num_topics,
+                           chunksize=chunksize, passes=passes)
+    serial = time.time() - start
+
+    workers = workers or max(1, multiprocessing.cpu_count() - 1)
+    start = time.time()
+    gensim.models.LdaMulticore(corpus=corpus, id2word=dictionary, num_topics=num_topics,
+                               workers=workers, chunksize=chunksize, passes=passes)
+    parallel = time.time() - start
+
+    return {'workers': workers, 'serial': serial, 'multicore': parallel,
+            'speedup': serial / parallel if parallel else float('inf')}
+
+########## MAIN ##########
+
+if __name__ == '__main__':
+    from corpus import StreamingCorpus
+    corpus = StreamingCorpus('data/*.txt', 'cache/sections', cache_dir='cache/tokens').load()
+
+    # Train until perplexity settles down, rather than for a fixed 10 passes. Seven documents
+    # only make one mini-batch, so use small chunks here to give the workers something to share.
+    lda, history, converged = train_multicore(corpus, corpus.dictionary, num_topics=2, chunksize=2)
+    if converged:
+        print('Converged after %s passes, perplexity %.2f' % (len(history), history[-1]))
+    else:
+        print('Stopped after %s passes without converging, perplexity %.2f' % (len(history), history[-1]))
+    for topic in lda.show_topics():
+        print(topic)
+
+    # On a corpus this small, process overhead will swamp any gains. Try it on a full session.
+    result = compare(corpus, corpus.dictionary, num_topics=2, chunksize=2)
+    print('Serial: %(serial).2fs, multicore (%(workers)s workers): %(multicore).2fs, speedup: %(speedup).2fx' % result)
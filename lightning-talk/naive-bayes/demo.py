@@ -10,8 +10,20 @@ The file naivebayes.py, included in this directory, is not used here. I just inc
 it so you can see a well-documented example of how the algorithm works. NLTK's version
 comes with a few bells and whistles that makes it more useful for our purposes.
 '''
-import nltk
-from nltk.corpus import stopwords
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# NLTK takes about a second to import, and its stopword list has to be read from disk,
+# so we put off both until we actually need them, and only load the stopwords once.
+_STOPWORDS = None
+
+def english_stopwords():
+    global _STOPWORDS
+    if _STOPWORDS is None:
+        from nltk.corpus import stopwords
+        _STOPWORDS = frozenset(stopwords.words('english'))
+    return _STOPWORDS
 
 def get_features(words):
     """
@@ -21,28 +33,43 @@ def get_features(words):
     the, and, or, etc.) so that our classifier can tell whether the presence of certain words
     is any more or less predictive of a press release title relating to drug trafficking.
     """
+    stoplist = english_stopwords()
     features = {}
-    for word in [i for i in words.split() if i not in stopwords.words('english')]:
+    for word in [i for i in words.split() if i not in stoplist]:
         features['contains_%s' % word.lower()] = True
     return features
-    
+
+def read_training(path=os.path.join(HERE, 'data', 'training.txt')):
+    """
+    Read training data: one headline per line, followed by a pipe and a YES/NO label.
+    """
+    with open(path, 'r') as infile:
+        return [line.strip().split('|') for line in infile if line.strip()]
+
+def train(training_data):
+    """
+    Create the actual training set by running each of the input data items through our
+    feature extracting function above, then train NLTK's classifier on it.
+    """
+    from nltk import NaiveBayesClassifier
+    train_set = [(get_features(n), g) for (n, g) in training_data]
+    return NaiveBayesClassifier.train(train_set)
+
+def classify(classifier, headline):
+    return classifier.classify(get_features(headline))
+
 if __name__ == '__main__':
     # The data we'll be using to train the classifier. Basically a list of headlines with a
     # YES/NO label attached, to identify whether the headline in question came from a drug-related
     # press release. Note that because we're using so little training data, it's not going to
     # generalize well and will only really work for this example.
-    training_data = [line.split('|') for line in open('data/training.txt').readlines()
+    training_data = read_training()
 
     # Eventually we're going to classify this
     toclassify = 'Five Columbia Residents among 10 Defendants Indicted for Conspiracy to Distribute a Ton of Marijuana'
 
-    # Create the actual training set by running each of the input data items through our
-    # feature extracting function above.
-    train_set = [(get_features(n), g) for (n, g) in training_data]
-
-    # Import and create the classifier, then train it using the training set we created above
-    from nltk import NaiveBayesClassifier
-    classifier = NaiveBayesClassifier.train(train_set)
+    # Create the training set from the data above and train the classifier on it
+    classifier = train(training_data)
 
     # Now classify the headline above
-    print classifier.classify(get_features(toclassify))
\ No newline at end of file
+    print(classify(classifier, toclassify))
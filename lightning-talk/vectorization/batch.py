@@ -0,0 +1,146 @@
+'''
+batch.py
+
+Roll call similarity for every House and Senate in a directory of Voteview .ord files.
+
+demo.py works on a single Congress. To look at every chamber and Congress at once,
+point this script at a directory of .ord files (like the ones at
+http://www.voteview.com/dwnl.htm) and it will work through them in parallel, one file
+per worker process. For each file, it writes two things to the output directory:
+
+    <name>.npy           The members x members agreement matrix, as float32
+    <name>.json          Summary statistics for that chamber and Congress
+
+Files whose results are already newer than the .ord file they came from are skipped,
+so after downloading one new file, re-running only has to process that one.
+
+Usage: python batch.py <ord directory> <output directory> [--processes N]
+'''
+import os, glob, json, argparse, multiprocessing
+import numpy
+import ordfile
+from votes import VoteMatrix
+from blocked import pairwise
+
+PARTIES = {100: 'Democrat', 200: 'Republican'}
+
+########## HELPERS ##########
+
+def outputs(path, output_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, '%s.npy' % name), os.path.join(output_dir, '%s.json' % name)
+
+def is_current(path, output_dir):
+    '''
+    True if both outputs exist and the summary was built from this exact version of
+    the .ord file.
+    '''
+    matrix_path, summary_path = outputs(path, output_dir)
+    if not (os.path.exists(matrix_path) and os.path.exists(summary_path)):
+        return False
+    try:
+        with open(summary_path, 'r') as infile:
+            source = json.load(infile)['source']
+    except (ValueError, KeyError):
+        return False
+    return source == {'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+
+def _mean(matrix, rows, cols):
+    '''
+    Mean similarity between two groups of members, leaving out each member's score
+    with themselves.
+    '''
+    block = numpy.asarray(matrix[numpy.ix_(rows, cols)], dtype=numpy.float64)
+    same = rows[:, numpy.newaxis] == cols
+    count = block.size - same.sum()
+    return float((block.sum() - block[same].sum()) / count) if count else None
+
+def summarize(rolls, matrix):
+    '''
+    Summary statistics for one chamber and Congress: its size, overall agreement, and
+    agreement within and between the two major parties.
+    '''
+    members = numpy.arange(len(rolls))
+    party = rolls.columns['party']
+    summary = {
+        'congress': int(rolls.columns['congress'][0]) if len(rolls) else None,
+        'members': len(rolls),
+        'roll_calls': rolls.codes.shape[1],
+        'mean_agreement': _mean(matrix, members, members),
+        'parties': {},
+    }
+    for code, label in sorted(PARTIES.items()):
+        ids = members[party == code]
+        summary['parties'][label] = {'members': len(ids), 'mean_agreement': _mean(matrix, ids, ids)}
+    dems, reps = members[party == 100], members[party == 200]
+    summary['mean_agreement_across_parties'] = _mean(matrix, dems, reps)
+    return summary
+
+########## WORKERS ##########
+
+def process(args):
+    '''
+    Worker function: load one .ord file, write its similarity matrix and summary, and
+    return the path of the summary.
+    '''
+    path, output_dir, block_size = args
+    matrix_path, summary_path = outputs(path, output_dir)
+    stat = os.stat(path)
+
+    # No .npz cache: it would be written into the input directory, which may be read-only,
+    # and is_current() already keeps us from parsing the same file twice.
+    rolls = ordfile.load(path, cache=False)
+    matrix, _ = pairwise(VoteMatrix(rolls.codes), matrix_path, metric='agreement', block_size=block_size)
+
+    summary = summarize(rolls, matrix)
+    summary['file'] = os.path.basename(path)
+    summary['chamber'] = os.path.basename(path)[:3]
+    summary['source'] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    # Write the summary last, and atomically, since its presence marks the file as done.
+    tmp = '%s.tmp' % summary_path
+    with open(tmp, 'w') as outfile:
+        json.dump(summary, outfile, indent=2, sort_keys=True)
+    os.rename(tmp, summary_path)
+    return summary_path
+
+def run(ord_dir, output_dir, processes=None, block_size=1024, force=False):
+    '''
+    Process every .ord file in ``ord_dir`` whose results in ``output_dir`` are missing
+    or out of date, spread across ``processes`` worker processes (one per CPU by
+    default). Returns the lists of processed and skipped files.
+    '''
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    paths = sorted(glob.glob(os.path.join(ord_dir, '*.ord')))
+    todo = [p for p in paths if force or not is_current(p, output_dir)]
+    skipped = [p for p in paths if p not in todo]
+    jobs = [(p, output_dir, block_size) for p in todo]
+
+    processes = min(processes or multiprocessing.cpu_count(), len(jobs))
+    if processes <= 1:
+        for job in jobs:
+            process(job)
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            for _ in pool.imap_unordered(process, jobs):
+                pass
+        finally:
+            pool.close()
+            pool.join()
+    return todo, skipped
+
+########## MAIN ##########
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Roll call similarity for a directory of .ord files.')
+    parser.add_argument('ord_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='Reprocess files even if results are current')
+    args = parser.parse_args()
+
+    processed, skipped = run(args.ord_dir, args.output_dir, args.processes, force=args.force)
+    print('Processed %s files, skipped %s up-to-date files' % (len(processed), len(skipped)))
@@ -0,0 +1,140 @@
+'''
+blocked.py
+
+Pairwise similarity for more members than fit in memory.
+
+Computing the whole members x members similarity matrix in one go is fine for a
+single House, but the matrix grows with the square of the number of members. Stack
+every lawmaker across several decades, or compare tens of thousands of donors
+instead, and it no longer fits in RAM.
+
+So instead we compute it in tiles: a block of rows against a block of columns at a
+time. Each finished tile is written into a NumPy memmap -- an array that lives in a
+file on disk and is paged in and out by the operating system as needed:
+http://docs.scipy.org/doc/numpy/reference/generated/numpy.memmap.html
+
+Often we don't want the whole matrix anyway, just each member's closest matches. In
+that case we can skip the file entirely and keep only the top k scores for every
+row, merging them in as each tile is finished. Blocks of rows are independent of each
+other, so they can also be farmed out to a pool of worker processes.
+'''
+import multiprocessing
+import numpy
+from numpy.lib.format import open_memmap
+
+########## TOP K ##########
+
+class TopK(object):
+    '''
+    The ``k`` highest scores in each row of a similarity matrix, and the columns they
+    came from, sorted from highest to lowest.
+    '''
+    def __init__(self, indices, scores):
+        self.indices = indices
+        self.scores = scores
+
+    @classmethod
+    def empty(cls, nrows, k):
+        return cls(numpy.full((nrows, k), -1, dtype=numpy.int64),
+                   numpy.full((nrows, k), -numpy.inf))
+
+    def merge(self, cols, tile):
+        '''
+        Fold a tile of scores (rows x len(cols)) into the running top k.
+        '''
+        indices = numpy.hstack([self.indices, numpy.broadcast_to(cols, tile.shape)])
+        scores = numpy.hstack([self.scores, tile])
+        k = self.scores.shape[1]
+        if scores.shape[1] > k:
+            best = numpy.argpartition(-scores, k - 1, axis=1)[:, :k]
+            indices = numpy.take_along_axis(indices, best, axis=1)
+            scores = numpy.take_along_axis(scores, best, axis=1)
+        order = numpy.argsort(-scores, axis=1, kind='mergesort')
+        self.indices = numpy.take_along_axis(indices, order, axis=1)
+        self.scores = numpy.take_along_axis(scores, order, axis=1)
+
+########## WORKERS ##########
+
+_STATE = {}
+
+def _init_worker(votes, path, metric, block_size, top_k, exclude_self):
+    _STATE.update(votes=votes, path=path, metric=metric, block_size=block_size,
+                  top_k=top_k, exclude_self=exclude_self)
+
+def _row_block(start):
+    '''
+    Compute one block of rows against every column, a tile at a time. Tiles go straight
+    into the memmap (if there is one); only this block's top k comes back to the caller.
+    '''
+    votes, path, block_size = _STATE['votes'], _STATE['path'], _STATE['block_size']
+    score = getattr(votes, _STATE['metric'])
+    n = len(votes)
+    rows = numpy.arange(start, min(start + block_size, n))
+
+    matrix = open_memmap(path, mode='r+') if path else None
+    top = TopK.empty(len(rows), _STATE['top_k']) if _STATE['top_k'] else None
+
+    for col_start in range(0, n, block_size):
+        cols = numpy.arange(col_start, min(col_start + block_size, n))
+        tile = score(rows, cols)
+        if matrix is not None:
+            matrix[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1] = tile
+        if top is not None:
+            if _STATE['exclude_self']:
+                tile[rows[:, numpy.newaxis] == cols] = -numpy.inf
+            top.merge(cols, tile)
+
+    if matrix is not None:
+        matrix.flush()
+        del matrix
+    return start, top
+
+########## MAIN ##########
+
+def pairwise(votes, path=None, top_k=None, metric='jaccard', block_size=1024,
+             processes=1, exclude_self=True, dtype=numpy.float32):
+    '''
+    Compute pairwise similarity between every member of a VoteMatrix, ``block_size``
+    rows and columns at a time, using the named ``metric`` method ('jaccard' or
+    'agreement').
+
+    If ``path`` is given, the full matrix is written to that .npy file and returned as
+    a read-only memmap. If ``top_k`` is given, the ``top_k`` best matches for each
+    member (leaving out the member themselves, unless ``exclude_self`` is False) are
+    returned as a TopK. If neither is given, the full matrix is returned in memory.
+    Blocks of rows are split across ``processes`` worker processes.
+
+    Returns a (matrix, top) pair; either can be None.
+    '''
+    if path is None and not top_k:
+        return getattr(votes, metric)(block_size=block_size).astype(dtype), None
+
+    n = len(votes)
+    if path:
+        open_memmap(path, mode='w+', dtype=dtype, shape=(n, n)).flush()
+
+    top = TopK.empty(n, top_k) if top_k else None
+    starts = range(0, n, block_size)
+
+    args = (votes, path, metric, block_size, top_k, exclude_self)
+    if processes == 1:
+        _init_worker(*args)
+        results = (_row_block(s) for s in starts)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes or None, _init_worker, args)
+        results = pool.imap_unordered(_row_block, starts)
+
+    try:
+        for start, block in results:
+            if top is not None:
+                top.indices[start:start + block_size] = block.indices
+                top.scores[start:start + block_size] = block.scores
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _STATE.clear()
+
+    matrix = open_memmap(path, mode='r') if path else None
+    return matrix, top
@@ -21,8 +21,10 @@ This script uses a vectorized approach to quickly produce a pairwise similarity
 lawmakers' roll call votes, given an input *.ord matrix file from Poole, McCarty and Lewis:
 http://www.voteview.com/dwnl.htm
 '''
-import numpy, string
-from scipy.spatial.distance import cdist
+import os
+import numpy
+
+HERE = os.path.dirname(os.path.abspath(__file__))
  
 ########## HELPERS ##########
  
@@ -30,46 +32,112 @@ class LookerUpper(object):
     '''
     Helper class to look up pairwise similarity scores by member, given an input name and
     similarity matrix.
+
+    Names are indexed once, so each lookup is a dictionary hit rather than a scan through
+    the list. If the full matrix was never built, pass a VoteMatrix as ``votes`` instead and
+    rows are computed on demand, using the VoteMatrix method named by ``metric``. When a
+    name appears more than once, the first one wins.
     '''
-    def __init__(self, names, matrix):
+    def __init__(self, names, matrix=None, votes=None, metric='jaccard'):
         self.names = names
         self.matrix = matrix
- 
+        self.votes = votes
+        self.metric = metric
+        self.index = dict((name, i) for i, name in reversed(list(enumerate(names))))
+
+    def ids(self, names):
+        return numpy.array([self.index[name] for name in names], dtype=numpy.int64)
+
+    def rows(self, ids):
+        '''
+        Similarity rows for the given member ids, as a (len(ids) x members) array.
+        '''
+        if self.matrix is not None:
+            return numpy.asarray(self.matrix[ids], dtype=numpy.float64)
+        return getattr(self.votes, self.metric)(rows=ids)
+
     def lookup(self, name):
-        for i, j in enumerate(self.matrix[self.names.index(name)]):
+        for i, j in enumerate(self.rows([self.index[name]])[0]):
             yield '%s: %s' % (self.names[i], j)
  
     def lookup_pair(self, name1, name2):
-        name1_idx = self.names.index(name1)
-        name2_idx = self.names.index(name2)
-        return '%s -> %s: %s' % (name1, name2, self.matrix[name1_idx, name2_idx])
+        name1_idx = self.index[name1]
+        name2_idx = self.index[name2]
+        if self.matrix is not None:
+            score = self.matrix[name1_idx, name2_idx]
+        else:
+            score = getattr(self.votes, self.metric)(rows=[name1_idx], cols=[name2_idx])[0, 0]
+        return '%s -> %s: %s' % (name1, name2, score)
+
+    def batch_top_k(self, names, k=10):
+        '''
+        The ``k`` most similar members to each of the given names, leaving out the member
+        themselves. Returns two (len(names) x k) arrays: member ids and scores, best first.
+        '''
+        ids = self.ids(names)
+        scores = self.rows(ids)
+        scores[numpy.arange(len(ids)), ids] = -numpy.inf
+        k = min(k, scores.shape[1] - 1)
+        best = numpy.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = numpy.take_along_axis(scores, best, axis=1)
+        order = numpy.argsort(-best_scores, axis=1, kind='mergesort')
+        return numpy.take_along_axis(best, order, axis=1), numpy.take_along_axis(best_scores, order, axis=1)
+
+    def top_k(self, name, k=10):
+        '''
+        The ``k`` most similar members to ``name``, as (name, score) pairs, best first.
+        '''
+        ids, scores = self.batch_top_k([name], k)
+        return [(self.names[i], float(score)) for i, score in zip(ids[0], scores[0])]
  
-def cleansplit(str):
+########## LIBRARY ##########
+
+def load_votes(path=os.path.join(HERE, 'data', 'hou112kh.ord')):
     '''
-    Split fixed-width input file. Sigh.
+    Load an .ord file (see ordfile.py) and pack its votes into a VoteMatrix (see votes.py).
+    Returns the member names and the matrix.
     '''
-    return map(string.strip, [str[:12], str[12:20], str[:20:25], str[25:36], str[36:]])
- 
+    import ordfile
+    from votes import VoteMatrix
+    rolls = ordfile.load(path)
+    return rolls.names, VoteMatrix(rolls.codes)
+
+def build_looker_upper(path=os.path.join(HERE, 'data', 'hou112kh.ord'), materialize=True):
+    '''
+    A LookerUpper for the members in an .ord file. With ``materialize`` False, the full
+    similarity matrix is never built and rows are computed as they're asked for, which
+    is quicker for a handful of lookups.
+    '''
+    names, votes = load_votes(path)
+    if materialize:
+        return LookerUpper(names, votes.jaccard())
+    return LookerUpper(names, votes=votes)
+
 ########## MAIN ##########
  
 if __name__ == '__main__':
-    with open('data/hou112kh.ord', 'rU') as infile:
-        rows = [cleansplit(a) for a in infile.readlines()] # Parse fixed-width .ord input file
-        names = [r[3] for r in rows] # r[3] is the name code
- 
-    # Build a numpy matrix from all the vote data in the input file.
-    data = numpy.matrix([[i for i in list(r[4])] for r in rows])
- 
-    # Calculate vectorized pairwise similarity between all senators using Jaccard distance,
-    # which is just a measure of what percentage of each lawmaker's votes lined up with another's.
-    # Subtracting from 1.0 just turns the measure into a similarity score rather than a distance.
-    # Notice how we're doing this in one line, not using loops.
-    similarities = 1.0 - cdist(data, data, 'jaccard')
+    # Parse the fixed-width .ord input file into a matrix of vote codes plus a column for each of the
+    # header fields, like member names. The parsed result is cached next to the input file, so later
+    # runs load it straight from there. See ordfile.py. Then pack the vote data into bit arrays: one
+    # each for the yeas, nays and present votes of every member. See votes.py for how the vote codes
+    # are mapped.
+    names, votes = load_votes()
+
+    # Calculate vectorized pairwise similarity between all members: of the roll calls either lawmaker
+    # voted on, the share where they both voted the same way (Jaccard similarity). Counting every roll
+    # call either of them voted on, not just the ones both did, keeps a member who cast a handful of
+    # votes from looking like a perfect match. Under the hood this is done with bitwise operations on
+    # whole blocks of members at once, not with loops. If there are too many members to hold the whole
+    # matrix in memory, blocked.py can write it to disk tile by tile instead.
+    similarities = votes.jaccard()
  
     # Print some similarities, given a lookup name
     looker_upper = LookerUpper(names, similarities)
     for i in looker_upper.lookup('CANTOR'):
-        print i
+        print(i)
  
+    # Or just the closest matches, best first
+    print(looker_upper.top_k('CANTOR', 5))
+
     # And here's a lookup of two names
-    print looker_upper.lookup_pair('DELBENE', 'CANTOR')
\ No newline at end of file
+    print(looker_upper.lookup_pair('DELBENE', 'CANTOR'))
\ No newline at end of file
@@ -0,0 +1,147 @@
+'''
+ordfile.py
+
+A fast loader for Voteview's fixed-width .ord roll call files:
+http://www.voteview.com/dwnl.htm
+
+Each line of an .ord file describes one member: a 36-character header (Congress,
+ICPSR id, state, district, party, name and so on) followed by one digit per roll call.
+Every line is the same width, so rather than slicing and stripping each line in
+Python, we can read the whole file as one block of bytes, reshape it into a
+(members x line width) array and pull columns out with array slicing. The votes become
+a uint8 matrix by subtracting the ASCII code for '0'; the header fields come from
+viewing the first 36 bytes of each line through a structured NumPy dtype:
+http://docs.scipy.org/doc/numpy/user/basics.rec.html
+
+Parsed files are cached next to the source as .npz files, so later runs can skip the
+parsing altogether until the .ord file changes. If the cache can't be written (say the
+file lives in a read-only directory), we just parse it every time.
+'''
+import os
+import numpy
+
+# Header layout of an .ord line. Everything after it is votes.
+HEADER = numpy.dtype([
+    ('congress', 'S3'),
+    ('icpsr', 'S5'),
+    ('state_code', 'S2'),
+    ('district', 'S2'),
+    ('state', 'S7'),
+    ('party', 'S4'),
+    ('occupancy', 'S1'),
+    ('attain', 'S1'),
+    ('name', 'S11'),
+])
+NUMERIC = ('congress', 'icpsr', 'state_code', 'district', 'party', 'occupancy', 'attain')
+
+########## HELPERS ##########
+
+def _to_ints(column):
+    '''
+    Convert a column of fixed-width byte strings to integers, treating blanks as 0.
+    '''
+    column = numpy.char.strip(column)
+    column[column == b''] = b'0'
+    return column.astype(numpy.int64)
+
+def _to_strings(column):
+    return numpy.char.strip(numpy.char.decode(column, 'ascii'))
+
+########## PARSING ##########
+
+class RollCalls(object):
+    '''
+    The contents of an .ord file: a (members x roll calls) uint8 matrix of vote codes,
+    plus one NumPy array per header field in ``columns``.
+    '''
+    def __init__(self, codes, columns):
+        self.codes = codes
+        self.columns = columns
+
+    @property
+    def names(self):
+        return self.columns['name'].tolist()
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def parse(cls, path):
+        '''
+        Parse an .ord file straight from its bytes.
+        '''
+        raw = numpy.fromfile(path, dtype=numpy.uint8)
+        if len(raw) and raw[-1] != ord('\n'):
+            raw = numpy.append(raw, numpy.uint8(ord('\n')))
+
+        newlines = numpy.flatnonzero(raw == ord('\n'))
+        if not len(newlines):
+            return cls(numpy.zeros((0, 0), dtype=numpy.uint8),
+                       dict((f, numpy.zeros(0)) for f in HEADER.names))
+        width = newlines[0] + 1
+        if len(raw) != width * len(newlines) or numpy.any(numpy.diff(newlines) != width):
+            raise ValueError('%s is not a fixed-width .ord file' % path)
+
+        lines = raw.reshape(len(newlines), width)
+        end = width - 2 if width > 1 and lines[0, -2] == ord('\r') else width - 1
+
+        codes = lines[:, HEADER.itemsize:end] - numpy.uint8(ord('0'))
+        header = numpy.ascontiguousarray(lines[:, :HEADER.itemsize]).view(HEADER).ravel()
+
+        columns = {}
+        for field in HEADER.names:
+            convert = _to_ints if field in NUMERIC else _to_strings
+            columns[field] = convert(header[field])
+        return cls(numpy.ascontiguousarray(codes), columns)
+
+    def save(self, path, source=None):
+        '''
+        Write to an .npz file. If ``source`` is given, its size and modification time
+        are stored too, so we can tell later whether the cache is still good. The file
+        is written under a temporary name and moved into place, so a failed write
+        can't leave a half-written cache behind.
+        '''
+        stamp = numpy.array([os.path.getsize(source), os.path.getmtime(source)]) if source else numpy.zeros(2)
+        tmp = '%s.%s.tmp' % (path, os.getpid())
+        try:
+            with open(tmp, 'wb') as outfile:
+                numpy.savez(outfile, codes=self.codes, source=stamp,
+                            **dict(('column_%s' % k, v) for k, v in self.columns.items()))
+            os.rename(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load_cache(cls, path, source=None):
+        '''
+        Read an .npz cache written by save(), or return None if it's missing or (when
+        ``source`` is given) out of date.
+        '''
+        if not os.path.exists(path):
+            return None
+        with numpy.load(path) as data:
+            if source is not None:
+                size, mtime = data['source']
+                if size != os.path.getsize(source) or mtime != os.path.getmtime(source):
+                    return None
+            columns = dict((k[len('column_'):], data[k]) for k in data.files if k.startswith('column_'))
+            return cls(data['codes'], columns)
+
+def load(path, cache=True):
+    '''
+    Load an .ord file, using (and refreshing) a cached copy at ``<path>.npz`` unless
+    ``cache`` is False. Failing to write the cache doesn't stop the load.
+    '''
+    cache_path = '%s.npz' % path
+    if cache:
+        rolls = RollCalls.load_cache(cache_path, source=path)
+        if rolls is not None:
+            return rolls
+    rolls = RollCalls.parse(path)
+    if cache:
+        try:
+            rolls.save(cache_path, source=path)
+        except (IOError, OSError):
+            pass
+    return rolls
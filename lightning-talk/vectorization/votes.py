@@ -0,0 +1,133 @@
+'''
+votes.py
+
+A compact representation of a roll call vote matrix, and fast pairwise similarity
+scores on top of it.
+
+Voteview's .ord files record each vote as a single digit:
+http://www.voteview.com/dwnl.htm
+
+    0      Not a member of the chamber for this vote
+    1,2,3  Yea (voted, paired or announced)
+    4,5,6  Nay (announced, paired or voted)
+    7,8    Present
+    9      Not voting
+
+Storing those digits as one-character strings (or even one byte apiece) wastes a lot
+of space on what is really just a few yes/no questions per vote. So VoteMatrix keeps
+three bit masks for each member -- voted yea, voted nay, voted present -- packed eight
+votes to a byte with numpy.packbits. Comparing two members then comes down to bitwise
+AND/OR across those masks and counting the bits that are set (a "popcount"), which
+NumPy can do for a whole block of member pairs at once.
+'''
+import numpy
+
+YEA = (1, 2, 3)
+NAY = (4, 5, 6)
+PRESENT = (7, 8)
+
+# Number of set bits in every possible byte, for NumPy versions without bitwise_count.
+_POPCOUNT = numpy.array([bin(i).count('1') for i in range(256)], dtype=numpy.uint8)
+
+########## HELPERS ##########
+
+def popcount(bits):
+    '''
+    Count the set bits along the last axis of an array of packed uint64 words.
+    '''
+    if hasattr(numpy, 'bitwise_count'):
+        return numpy.bitwise_count(bits).sum(axis=-1, dtype=numpy.int64)
+    return _POPCOUNT[bits.view(numpy.uint8)].sum(axis=-1, dtype=numpy.int64)
+
+def pack(mask):
+    '''
+    Pack a (members x votes) boolean array into (members x words) uint64 bit arrays,
+    padding each row with zeros to a whole number of 64-bit words.
+    '''
+    packed = numpy.packbits(mask, axis=1)
+    padding = -packed.shape[1] % 8
+    if padding:
+        packed = numpy.hstack([packed, numpy.zeros((packed.shape[0], padding), dtype=numpy.uint8)])
+    return numpy.ascontiguousarray(packed).view(numpy.uint64)
+
+########## VOTE MATRIX ##########
+
+class VoteMatrix(object):
+    '''
+    Yea, nay and present bit masks for every member's roll call votes, built from a
+    (members x votes) array of Voteview vote codes.
+    '''
+    def __init__(self, codes):
+        codes = numpy.asarray(codes, dtype=numpy.uint8)
+        self.shape = codes.shape
+        self.yea = pack(numpy.isin(codes, YEA))
+        self.nay = pack(numpy.isin(codes, NAY))
+        self.present = pack(numpy.isin(codes, PRESENT))
+
+    @classmethod
+    def from_strings(cls, rows):
+        '''
+        Build a matrix from one string of vote digits per member, as they appear in an
+        .ord file.
+        '''
+        rows = [r.strip() for r in rows]
+        codes = numpy.frombuffer(''.join(rows).encode('ascii'), dtype=numpy.uint8)
+        return cls((codes - ord('0')).reshape(len(rows), -1))
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.yea.nbytes + self.nay.nbytes + self.present.nbytes
+
+    def counts(self, rows=None, cols=None):
+        '''
+        For every pair of a member in ``rows`` and a member in ``cols`` (slices or index
+        arrays, all members by default), count the roll calls where they voted the same
+        way, where both voted, and where either voted. Returns three (rows x cols) arrays.
+        '''
+        rows = slice(None) if rows is None else rows
+        cols = slice(None) if cols is None else cols
+
+        y1, n1, p1 = [m[rows][:, numpy.newaxis, :] for m in (self.yea, self.nay, self.present)]
+        y2, n2, p2 = [m[cols][numpy.newaxis, :, :] for m in (self.yea, self.nay, self.present)]
+        voted1, voted2 = y1 | n1 | p1, y2 | n2 | p2
+
+        same = popcount((y1 & y2) | (n1 & n2) | (p1 & p2))
+        both = popcount(voted1 & voted2)
+        either = popcount(voted1 | voted2)
+        return same, both, either
+
+    def _index(self, selection):
+        return numpy.arange(self.shape[0])[slice(None) if selection is None else selection]
+
+    def _score(self, rows, cols, block_size, pick):
+        '''
+        Fill a (rows x cols) score matrix a block of rows at a time, so the intermediate
+        bit arrays never get bigger than about 64MB unless ``block_size`` says otherwise.
+        '''
+        rows, cols = self._index(rows), self._index(cols)
+        if block_size is None:
+            block_size = max(1, (64 << 20) // max(1, len(cols) * self.yea.nbytes // max(1, len(self)) * 3))
+        result = numpy.empty((len(rows), len(cols)))
+        for start in range(0, len(rows), block_size):
+            numerator, denominator = pick(*self.counts(rows[start:start + block_size], cols))
+            result[start:start + len(numerator)] = numerator / numpy.maximum(denominator, 1).astype(numpy.float64)
+        return result
+
+    def agreement(self, rows=None, cols=None, block_size=None):
+        '''
+        Share of roll calls that both members voted on where they voted the same way.
+        Pairs that never voted on the same roll call score 0. This ignores how many roll
+        calls that is, so a member who hardly voted can score 1 with plenty of others;
+        jaccard() doesn't have that problem.
+        '''
+        return self._score(rows, cols, block_size, lambda same, both, either: (same, both))
+
+    def jaccard(self, rows=None, cols=None, block_size=None):
+        '''
+        Jaccard similarity: roll calls where both members voted the same way, divided
+        by roll calls where either of them voted.
+        '''
+        return self._score(rows, cols, block_size, lambda same, both, either: (same, either))
@@ -31,7 +31,7 @@ if __name__ == '__main__':
 
     # Build the tree using Jaccard similarity as the metric. First argument
     # is just a list of words.
-    print "Building ..."
+    print("Building ...")
     tree = VPTree(words, jaccard)
 
     # Query the tree, using the most commonly occurring version of the
@@ -40,4 +40,4 @@ if __name__ == '__main__':
     # getting all variants with Jaccard distance up to 0.8, but that
     # parameter needs to be tuned based on the structure of the tree, so
     # feel free to experiment if you index your own stuff.
-    print tree.search('PACIFIC GAS & ELEC', 0.8)
\ No newline at end of file
+    print(tree.search('PACIFIC GAS & ELEC', 0.8))
\ No newline at end of file
@@ -298,10 +298,10 @@ class MetricTree(object):
         try: 
             distance = self._func(self._values[0], obj) 
             DIST_CTR += 1 
-        except IndexError, e: 
+        except IndexError as e: 
             sys.stderr.write("Node is empty, cannot calculate distance!\n") 
             raise e 
-        except Exception, e: 
+        except Exception as e: 
             raise UnindexableObjectError(e, "Cannot calculate distance" 
                     + " between objects %s and %s using %s" \
                         % (self._values[0], obj, self._func)) 
@@ -459,7 +459,7 @@ class VPTree(MetricTree):
             else: 
                 dist_per_obj.append( (distance, obj) ) 
         if dist_per_obj: 
-            self._median = VPTree.determine_median(zip(*dist_per_obj)[0]) 
+            self._median = VPTree.determine_median(list(zip(*dist_per_obj))[0]) 
             left  = [ obj for dist, obj in dist_per_obj 
                       if dist < self._median ] 
             right = [ obj for dist, obj in dist_per_obj  
@@ -479,7 +479,7 @@ class VPTree(MetricTree):
         relies on CPython's speed when sorting (``O(n log(n))``). 
  
         """ 
-        return sorted(numbers)[ len(numbers) / 2  ] 
+        return sorted(numbers)[ len(numbers) // 2  ] 
  
     def _get_child_candidates(self, distance, min_dist, max_dist): 
         if self._leftchild and distance - max_dist < self._median: 